@@ -8,8 +8,16 @@ bl_info = {
     "category":    "Object",
 }
 
+import hashlib
+from itertools import chain
+
 import bpy
-from mathutils import Vector
+from bpy.app.handlers import persistent
+from mathutils import Quaternion, Vector
+from mathutils.bvhtree import BVHTree
+
+# numpy is imported inside the helpers that use it, so enabling the add‑on does
+# not pay for it until the operator first runs.
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Constants & Helpers
@@ -24,29 +32,243 @@ ENUM_ITEMS = [
     ("POS_Y", "+Y (Back)", "Cast toward positive Y"),
 ]
 
+# Unit ray direction per (axis index, sign), built once.
+_AXIS_UNITS = {
+    (axis, sign): Vector([sign if i == axis else 0.0 for i in range(3)])
+    for axis in range(3) for sign in (-1.0, 1.0)
+}
 
-def extreme_offset(obj: bpy.types.Object, normal: Vector) -> float:
-    """Return the scalar distance (along *normal*) from the origin to the extreme
-    bounding‑box vertex that lies *against* the surface (i.e. along -normal)."""
-    corners_world = [obj.matrix_world @ Vector(c) for c in obj.bound_box]
-    return min((co - obj.location).dot(normal) for co in corners_world)
+# Object types whose evaluated geometry can serve as ground.
+GROUND_TYPES = {'MESH', 'CURVE', 'SURFACE', 'FONT', 'META'}
 
+# Ground BVHs reused across invocations: digest from _ground_cache_key() ->
+# (tree, frozenset of the object/data pointers it was built from).
+_BVH_CACHE = {}
+_BVH_CACHE_MAX = 4
 
-def cast_axis_ray(scene: bpy.types.Scene,
-                  depsgraph: bpy.types.Depsgraph,
-                  obj: bpy.types.Object,
-                  direction: Vector,
-                  ray_max: float):
-    """Cast a ray along *direction* ignoring *obj* itself and return hit info."""
-    direction = direction.normalized()
-    start = obj.location - direction * ray_max  # start behind the object
-    hit, loc, normal, idx, hit_obj, _ = scene.ray_cast(depsgraph, start, direction, distance=ray_max * 2)
 
-    eps = 1e-4
-    while hit and hit_obj == obj:
-        start = loc + direction * eps
-        hit, loc, normal, idx, hit_obj, _ = scene.ray_cast(depsgraph, start, direction, distance=ray_max * 2)
-    return hit, loc, normal
+def extreme_offset(obj: bpy.types.Object, normal: Vector) -> float:
+    """Return the scalar distance (along *normal*) from the origin to the extreme
+    bounding‑box vertex that lies *against* the surface (i.e. along -normal)."""
+    import numpy as np
+
+    mw = np.fromiter(chain.from_iterable(obj.matrix_world), dtype=np.float64, count=16).reshape(4, 4)
+    bb = np.fromiter(chain.from_iterable(obj.bound_box), dtype=np.float64, count=24).reshape(8, 3)
+    corners_world = bb @ mw[:3, :3].T + mw[:3, 3]
+    loc = np.array(obj.location, dtype=np.float64)
+    return float(((corners_world - loc) @ np.array(normal, dtype=np.float64)).min())
+
+
+def axis_extreme_offset(obj: bpy.types.Object, axis: int, sign: float) -> float:
+    """Fast path of :func:`extreme_offset` for a normal equal to ``sign`` times
+    world axis *axis*: only that one coordinate of each corner is needed."""
+    r0, r1, r2, r3 = obj.matrix_world[axis][:]  # only this row affects the result
+    best = float('inf')
+    for cx, cy, cz in obj.bound_box:
+        d = sign * (r0 * cx + r1 * cy + r2 * cz + r3)
+        if d < best:
+            best = d
+    return best - sign * obj.location[axis]
+
+
+def aligned_axis(normal: Vector, tol: float = 0.9999):
+    """Return ``(axis, sign)`` if *normal* is effectively a world axis, else ``None``."""
+    for axis in range(3):
+        if abs(normal[axis]) > tol:
+            return axis, (1.0 if normal[axis] > 0.0 else -1.0)
+    return None
+
+
+def shortest_arc_z_to(normal: Vector) -> Quaternion:
+    """Rotation taking +Z onto unit *normal* along the shortest arc.
+
+    Half‑angle form of ``(1 + z·n, z × n)``; the antipode ``n ≈ -Z`` has no
+    unique axis, so it flips 180° about X."""
+    nx, ny, nz = normal
+    if nz < -0.9999:
+        return Quaternion((0.0, 1.0, 0.0, 0.0))
+    q = Quaternion((1.0 + nz, -ny, nx, 0.0))
+    q.normalize()
+    return q
+
+
+def has_surface(obj_eval: bpy.types.Object) -> bool:
+    """Cheap pre‑filter: True for an evaluated ground candidate that can add faces.
+
+    Evaluated meshes already include modifiers, so an empty polygon list is
+    final and the object is skipped before paying for a BVH build."""
+    if obj_eval.type not in GROUND_TYPES:
+        return False
+    return obj_eval.type != 'MESH' or len(obj_eval.data.polygons) > 0
+
+
+def iter_ground(depsgraph: bpy.types.Depsgraph, target, exclude):
+    """Yield ``(evaluated object, world matrix)`` for every ground surface.
+
+    With *target* set only that object is used, without touching
+    ``depsgraph.object_instances``; otherwise every visible
+    instance in *depsgraph* (collection instances, curves and text included)
+    whose owner is not in *exclude*. Instance data is only valid until the next
+    step, so consume each item before advancing."""
+    if target is not None:
+        target_eval = target.evaluated_get(depsgraph)
+        yield target_eval, target_eval.matrix_world
+        return
+    for inst in depsgraph.object_instances:
+        obj = inst.object
+        owner = inst.parent if inst.is_instance else obj
+        if owner.original in exclude or not has_surface(obj):
+            continue
+        yield obj, inst.matrix_world
+
+
+def build_ground_bvh(sources) -> BVHTree:
+    """Merge the evaluated polygons of *sources* (see :func:`iter_ground`) into a
+    single world‑space BVH."""
+    import numpy as np
+
+    vert_chunks = []
+    tri_chunks = []
+    base = 0
+    for obj_eval, matrix in sources:
+        mesh = obj_eval.to_mesh()
+        mesh.calc_loop_triangles()
+
+        co = np.empty(len(mesh.vertices) * 3, dtype=np.float32)  # native dtype: raw copy
+        mesh.vertices.foreach_get("co", co)
+        mw = np.array(matrix, dtype=np.float64)
+        vert_chunks.append(co.reshape(-1, 3) @ mw[:3, :3].T + mw[:3, 3])
+
+        tris = np.empty(len(mesh.loop_triangles) * 3, dtype=np.int32)
+        mesh.loop_triangles.foreach_get("vertices", tris)
+        tri_chunks.append(tris.reshape(-1, 3) + base)
+
+        base += len(mesh.vertices)
+        obj_eval.to_mesh_clear()
+
+    verts = np.concatenate(vert_chunks) if vert_chunks else np.empty((0, 3))
+    tris = np.concatenate(tri_chunks) if tri_chunks else np.empty((0, 3), dtype=np.int32)
+    return BVHTree.FromPolygons(verts.tolist(), tris.tolist())
+
+
+def _ground_cache_key(sources):
+    """Return ``(digest, ptrs)`` identifying a ground set, or ``(None, None)``
+    when *sources* is empty.
+
+    *digest* hashes the original object and data pointers plus every world
+    matrix, so the key stays a few bytes however many instances there are;
+    *ptrs* is what :func:`_invalidate_bvh_cache` checks updates against."""
+    import numpy as np
+
+    obj_ptrs = []
+    data_ptrs = []
+    matrices = []
+    for obj_eval, matrix in sources:
+        orig = obj_eval.original
+        data = orig.data
+        obj_ptrs.append(orig.as_pointer())
+        data_ptrs.append(data.as_pointer() if data else 0)
+        matrices.extend(chain.from_iterable(matrix))
+    if not obj_ptrs:
+        return None, None
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(np.array(obj_ptrs + data_ptrs, dtype=np.uint64).tobytes())
+    h.update(np.array(matrices, dtype=np.float64).tobytes())
+    ptrs = frozenset(obj_ptrs).union(data_ptrs)
+    return h.digest(), ptrs - {0}
+
+
+def cached_ground_bvh(depsgraph: bpy.types.Depsgraph, target, exclude):
+    """:func:`build_ground_bvh` over :func:`iter_ground`, reusing the tree while
+    the ground is unchanged. Returns ``None`` when there is no ground at all.
+
+    With *target* set, :func:`iter_ground` yields that single object, so the key
+    covers only its pointers and matrix and ``depsgraph.object_instances`` is
+    never walked, hit or miss. Keep it that way: this is the fast path for
+    large scenes.
+
+    Moving a ground object changes the key; editing its geometry is caught by
+    :func:`_invalidate_bvh_cache` and animating it by :func:`_clear_bvh_cache`."""
+    key, ptrs = _ground_cache_key(iter_ground(depsgraph, target, exclude))
+    if key is None:
+        return None
+    entry = _BVH_CACHE.get(key)
+    if entry is None:
+        if len(_BVH_CACHE) >= _BVH_CACHE_MAX:
+            del _BVH_CACHE[next(iter(_BVH_CACHE))]  # oldest first
+        entry = _BVH_CACHE[key] = (build_ground_bvh(iter_ground(depsgraph, target, exclude)), ptrs)
+    return entry[0]
+
+
+@persistent
+def _invalidate_bvh_cache(scene, depsgraph):
+    """Drop cached trees whose objects or meshes had a geometry update."""
+    if not _BVH_CACHE:
+        return
+    changed = {u.id.original.as_pointer() for u in depsgraph.updates if u.is_updated_geometry}
+    if not changed:
+        return
+    stale = [key for key, (_tree, ptrs) in _BVH_CACHE.items() if not ptrs.isdisjoint(changed)]
+    for key in stale:
+        del _BVH_CACHE[key]
+
+
+@persistent
+def _clear_bvh_cache(*_args):
+    """Drop every cached tree. Pointers are meaningless once another file is
+    loaded, and a frame change can deform the ground (shape keys, armatures,
+    animated Geometry Nodes) without touching any key or firing
+    ``depsgraph_update_post``."""
+    _BVH_CACHE.clear()
+
+
+def cast_axis_rays(tree: BVHTree,
+                   objects,
+                   axis: int,
+                   sign: float,
+                   ray_max: float) -> list:
+    """Cast one ray per object along world axis *axis* (towards *sign*) and return
+    the raw ``(location, normal, index, distance)`` hits in the same order.
+
+    *tree* is built without the selected objects, so no self‑hits need to be
+    skipped."""
+    import numpy as np
+
+    direction = _AXIS_UNITS[axis, sign]
+    origins = np.array([o.location for o in objects], dtype=np.float64).reshape(-1, 3)
+    origins[:, axis] -= sign * ray_max  # start behind each object
+    _cast = tree.ray_cast
+    distance = ray_max * 2
+    return [_cast(start, direction, distance) for start in origins.tolist()]
+
+
+def solve_placements(tree: BVHTree,
+                     objects,
+                     axis: int,
+                     sign: float,
+                     ray_max: float,
+                     align: bool) -> list:
+    """Return the new ``(location, normal)`` for each object, or ``None`` where
+    the ray missed. Read‑only: nothing is written back to *objects*.
+
+    Pass evaluated objects (``evaluated_get``) so the bounding box includes
+    modifiers."""
+    hits = cast_axis_rays(tree, objects, axis, sign, ray_max)
+    placements = []
+    append = placements.append
+    for obj, (loc, normal, _idx, _dist) in zip(objects, hits):
+        if loc is None:
+            append(None)
+            continue
+
+        axis_sign = None if align else aligned_axis(normal)
+        if axis_sign is not None:
+            offset = axis_extreme_offset(obj, *axis_sign)
+        else:
+            offset = extreme_offset(obj, normal)
+        append((loc - normal * offset, normal))
+    return placements
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -80,35 +302,60 @@ class OBJECT_OT_surface_conform(bpy.types.Operator):
         default="NEG_Z",
     )
 
-    _DIR_VECTS = {
-        "NEG_Z": Vector((0, 0, -1)),
-        "POS_Z": Vector((0, 0,  1)),
-        "NEG_X": Vector((-1, 0, 0)),
-        "POS_X": Vector((1, 0,  0)),
-        "NEG_Y": Vector((0, -1, 0)),
-        "POS_Y": Vector((0, 1,  0)),
+    # (axis index, sign) per direction; every choice is axis‑aligned.
+    _DIR_AXIS = {
+        "NEG_Z": (2, -1.0),
+        "POS_Z": (2,  1.0),
+        "NEG_X": (0, -1.0),
+        "POS_X": (0,  1.0),
+        "NEG_Y": (1, -1.0),
+        "POS_Y": (1,  1.0),
     }
 
     def execute(self, ctx):
-        scene = ctx.scene
         depsgraph = ctx.evaluated_depsgraph_get()
-        direction_vec = self._DIR_VECTS[self.ray_direction]
-
-        for obj in ctx.selected_objects:
-            if obj.type != 'MESH':
+        axis, sign = self._DIR_AXIS[self.ray_direction]
+
+        target = ctx.scene.surface_conformer_target
+
+        # Props are never raycast against, so vertex/edge‑only meshes still qualify.
+        mesh_objs = [o for o in ctx.selected_objects
+                     if o.type == 'MESH' and o != target and not o.hide_get()]
+        if not mesh_objs:
+            self.report({'WARNING'}, "No visible mesh selected")
+            return {'CANCELLED'}
+
+        tree = cached_ground_bvh(depsgraph, target, set(ctx.selected_objects))
+        if tree is None:
+            self.report({'WARNING'}, "No visible unselected surface to conform onto")
+            return {'CANCELLED'}
+
+        # Read evaluated transforms/bounds (modifiers included), write to originals.
+        eval_objs = [o.evaluated_get(depsgraph) for o in mesh_objs]
+
+        # RNA property reads cross into C every time; read them once.
+        align = self.align_rotation
+        report = self.report
+        placements = solve_placements(tree, eval_objs, axis, sign, self.ray_max, align)
+
+        # Apply serially: only this phase touches bpy data.
+        quat_cache = {}  # quantized normal -> Quaternion; flat ground shares one entry
+        cache_get = quat_cache.get
+        for obj, placement in zip(mesh_objs, placements):
+            if placement is None:
+                report({'INFO'}, f"No surface hit for {obj.name}")
                 continue
 
-            hit, loc, normal = cast_axis_ray(scene, depsgraph, obj, direction_vec, self.ray_max)
-            if not hit:
-                self.report({'INFO'}, f"No surface hit for {obj.name}")
-                continue
-
-            if self.align_rotation:
+            new_loc, normal = placement
+            if align:
                 obj.rotation_mode = 'QUATERNION'
-                obj.rotation_quaternion = normal.to_track_quat('Z', 'Y')
-
-            offset = extreme_offset(obj, normal)
-            obj.location = loc - normal * offset
+                nx, ny, nz = normal
+                key = (round(nx * 1024), round(ny * 1024), round(nz * 1024))
+                q = cache_get(key)
+                if q is None:
+                    q = quat_cache[key] = shortest_arc_z_to(normal)
+                obj.rotation_quaternion = q.copy()
+            obj.location = new_loc
 
         return {'FINISHED'}
 
@@ -136,6 +383,7 @@ class VIEW3D_PT_surface_conformer(bpy.types.Panel):
         col.prop(ctx.scene, "surface_conformer_direction", text="Direction")
         col.prop(ctx.scene, "surface_conformer_align", text="Align Z to Normal")
         col.prop(ctx.scene, "surface_conformer_ray_max", text="Ray Length")
+        col.prop(ctx.scene, "surface_conformer_target", text="Ground")
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -167,15 +415,31 @@ def register():
         default=1000.0,
         min=0.0,
     )
+    bpy.types.Scene.surface_conformer_target = bpy.props.PointerProperty(
+        name="Ground",
+        description="Only conform onto this mesh (leave empty to use every visible unselected surface)",
+        type=bpy.types.Object,
+        poll=lambda self, obj: obj.type == 'MESH',
+    )
+
+    bpy.app.handlers.depsgraph_update_post.append(_invalidate_bvh_cache)
+    bpy.app.handlers.load_post.append(_clear_bvh_cache)
+    bpy.app.handlers.frame_change_post.append(_clear_bvh_cache)
 
 
 def unregister():
+    bpy.app.handlers.frame_change_post.remove(_clear_bvh_cache)
+    bpy.app.handlers.load_post.remove(_clear_bvh_cache)
+    bpy.app.handlers.depsgraph_update_post.remove(_invalidate_bvh_cache)
+    _BVH_CACHE.clear()
+
     for c in reversed(classes):
         bpy.utils.unregister_class(c)
 
     del bpy.types.Scene.surface_conformer_direction
     del bpy.types.Scene.surface_conformer_align
     del bpy.types.Scene.surface_conformer_ray_max
+    del bpy.types.Scene.surface_conformer_target
 
 
 if __name__ == "__main__":